@@ -8,14 +8,19 @@ from fastapi.security import HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from .utils import get_admin_password, get_jwt_secret
+from .utils import get_admin_password, get_jwt_secret, get_settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; BCRYPT_ROUNDS is read once, when this module is imported
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=get_settings().bcrypt_rounds,
+)
 
 # JWT configuration
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 720  # 12 hours
+USER_SESSION_EXPIRE_DAYS = 30
 
 # Security scheme
 security = HTTPBearer()
@@ -98,6 +103,44 @@ def authenticate_admin(password: str) -> bool:
     return password == admin_password
 
 
+def create_user_session_cookie(user_id: int, name: str, session_token: str) -> str:
+    """Create a signed cookie value carrying the user's identity.
+
+    The token is bound to the user's session token so a stale signed cookie
+    is never trusted for a different session.
+
+    Args:
+        user_id: User ID
+        name: User's display name
+        session_token: User's session token
+
+    Returns:
+        Signed cookie value
+    """
+    expire = datetime.now(timezone.utc) + timedelta(days=USER_SESSION_EXPIRE_DAYS)
+    return jwt.encode(
+        {"uid": user_id, "name": name, "tok": session_token, "exp": expire},
+        get_jwt_secret(),
+        algorithm=ALGORITHM,
+    )
+
+
+def verify_user_session_cookie(cookie: str, session_token: str) -> Optional[dict]:
+    """Verify a signed user session cookie without touching the database.
+
+    Args:
+        cookie: Signed cookie value
+        session_token: Session token the cookie must be bound to
+
+    Returns:
+        User data dict with ``id`` and ``name`` if valid, None otherwise
+    """
+    payload = verify_token(cookie)
+    if payload is None or payload.get("tok") != session_token:
+        return None
+    return {"id": payload["uid"], "name": payload["name"]}
+
+
 def create_admin_token() -> str:
     """Create an admin JWT token.
 
@@ -5,7 +5,7 @@ This module provides async SQLite database operations using aiosqlite.
 
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import aiosqlite
 
@@ -31,39 +31,118 @@ def get_event_broadcaster():
 class Database:
     """Async SQLite database manager."""
 
+    # A user has one ranking per meme per session; re-rating replaces the score
+    _UPSERT_RANKING_SQL = """INSERT INTO rankings (user_id, meme_id, score, session_id)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(user_id, meme_id, session_id)
+                   DO UPDATE SET score = excluded.score, created_at = CURRENT_TIMESTAMP"""
+
+    # Per-connection settings shared by file and in-memory databases
+    _COMMON_PRAGMAS = """
+        PRAGMA foreign_keys=ON;
+        PRAGMA cache_size=-65536;
+        PRAGMA temp_store=memory;
+        PRAGMA mmap_size=268435456;
+        PRAGMA busy_timeout=30000;
+    """
+    # WAL makes synchronous=NORMAL crash-safe; commits append instead of fsync
+    _FILE_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL;PRAGMA wal_autocheckpoint=1000;" + _COMMON_PRAGMAS
+    )
+    # Nothing reaches disk, so skip the journal file and fsyncs entirely
+    _MEMORY_PRAGMAS = (
+        "PRAGMA journal_mode=MEMORY;PRAGMA synchronous=OFF;" + _COMMON_PRAGMAS
+    )
+
     def __init__(self, db_path: str = "data/memes.db"):
         """Initialize database connection manager.
 
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file, or a ``file:`` URI such as
+                ``file:/test?vfs=memdb`` for an in-memory database that
+                every connection in the process shares
         """
         self.db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._wal_path: Optional[str] = None
         self._ensure_data_dir()
 
+    @property
+    def is_uri(self) -> bool:
+        """Whether db_path is a SQLite ``file:`` URI rather than a plain path."""
+        return self.db_path.startswith("file:")
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the database lives in memory (nothing to persist or fsync)."""
+        return self.db_path == ":memory:" or (
+            self.is_uri
+            and ("vfs=memdb" in self.db_path or "mode=memory" in self.db_path)
+        )
+
+    def _connect(self) -> aiosqlite.Connection:
+        """Create a connection, honouring URI paths."""
+        return aiosqlite.connect(self.db_path, uri=self.is_uri)
+
+    async def __aenter__(self) -> "Database":
+        """Open one connection that all operations share until exit."""
+        self._conn = await self._connect()
+        try:
+            await self._configure_connection(self._conn)
+        except BaseException:
+            # Close it, or aiosqlite's non-daemon thread keeps the process alive
+            conn, self._conn = self._conn, None
+            await conn.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Close the shared connection."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.close()
+
     def _ensure_data_dir(self):
         """Ensure data directory exists."""
+        if self.is_uri or self.in_memory:
+            return
         db_dir = Path(self.db_path).parent
         db_dir.mkdir(parents=True, exist_ok=True)
 
     @asynccontextmanager
     async def get_connection(self):
-        """Get database connection with proper setup and optimization."""
-        async with aiosqlite.connect(self.db_path) as conn:
-            # Enable WAL mode for better concurrency
-            await conn.execute("PRAGMA journal_mode=WAL")
-            # Enable foreign key constraints
-            await conn.execute("PRAGMA foreign_keys=ON")
-            # Optimize SQLite for concurrent access
-            await conn.execute("PRAGMA synchronous=NORMAL")
-            await conn.execute("PRAGMA cache_size=10000")
-            await conn.execute("PRAGMA temp_store=memory")
-            await conn.execute("PRAGMA mmap_size=268435456")  # 256MB
-            # Set busy timeout for better concurrency
-            await conn.execute("PRAGMA busy_timeout=30000")  # 30 seconds
-            # Set row factory for dict-like access
-            conn.row_factory = aiosqlite.Row
+        """Get database connection with proper setup and optimization.
+
+        Inside ``async with Database(...)`` the shared connection is reused;
+        otherwise a new connection is opened for the operation.
+        """
+        if self._conn is not None:
+            yield self._conn
+            return
+
+        async with self._connect() as conn:
+            await self._configure_connection(conn)
             yield conn
 
+    async def _configure_connection(self, conn: aiosqlite.Connection):
+        """Apply connection PRAGMAs and the row factory.
+
+        All PRAGMAs go to the worker thread in a single executescript call.
+        WAL is persistent in the database file, so it is only switched on by
+        the first connection to each file path.
+        """
+        if self.in_memory:
+            script = self._MEMORY_PRAGMAS
+        elif self._wal_path == self.db_path:
+            script = self._FILE_PRAGMAS
+        else:
+            script = "PRAGMA journal_mode=WAL;\n" + self._FILE_PRAGMAS
+        await conn.executescript(script)
+        if not self.in_memory:
+            self._wal_path = self.db_path
+        # Set row factory for dict-like access
+        conn.row_factory = aiosqlite.Row
+
     # User operations
     async def create_user(self, name: str, session_token: str) -> int:
         """Create a new user.
@@ -131,6 +210,22 @@ class Database:
             await conn.commit()
             return cursor.lastrowid
 
+    async def create_memes_bulk(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """Create many meme entries in a single transaction.
+
+        Args:
+            rows: (filename, path) pairs
+
+        Returns:
+            Number of memes created
+        """
+        async with self.get_connection() as conn:
+            cursor = await conn.executemany(
+                "INSERT INTO memes (filename, path) VALUES (?, ?)", rows
+            )
+            await conn.commit()
+            return cursor.rowcount
+
     async def get_active_memes(self) -> List[Dict[str, Any]]:
         """Get all active memes.
 
@@ -195,38 +290,82 @@ class Database:
 
         async with self.get_connection() as conn:
             cursor = await conn.execute(
-                """INSERT INTO rankings (user_id, meme_id, score, session_id)
-                   VALUES (?, ?, ?, ?)
-                   ON CONFLICT(user_id, meme_id, session_id)
-                   DO UPDATE SET score = excluded.score, created_at = CURRENT_TIMESTAMP""",
-                (user_id, meme_id, score, session_id),
+                self._UPSERT_RANKING_SQL, (user_id, meme_id, score, session_id)
             )
             await conn.commit()
             ranking_id = cursor.lastrowid
 
-            # Broadcast new rating event
-            try:
-                from .events import EventType
+        # Broadcast the rating and refreshed stats off the request path
+        from .events import schedule_broadcast
 
-                broadcaster = get_event_broadcaster()
-                await broadcaster.broadcast_rating_event(
-                    EventType.NEW_RATING,
-                    {
-                        "ranking_id": ranking_id,
-                        "user_id": user_id,
-                        "meme_id": meme_id,
-                        "score": score,
-                    },
-                )
+        schedule_broadcast(
+            self._broadcast_new_rating,
+            {
+                "ranking_id": ranking_id,
+                "user_id": user_id,
+                "meme_id": meme_id,
+                "score": score,
+            },
+        )
 
-                # Also broadcast stats update
-                meme_stats = await self.get_meme_stats()
-                await broadcaster.broadcast_stats_update({"meme_stats": meme_stats})
+        return ranking_id
 
-            except Exception as e:
-                logger.error(f"Failed to broadcast rating event: {e}")
+    async def _broadcast_new_rating(self, rating_data: Dict[str, Any]):
+        """Broadcast a new rating event followed by a stats update.
+
+        Args:
+            rating_data: Ranking ID, user ID, meme ID and score
+        """
+        from .events import EventType
+
+        broadcaster = get_event_broadcaster()
+        await broadcaster.broadcast_rating_event(EventType.NEW_RATING, rating_data)
+        await self._broadcast_stats_update()
+
+    async def _broadcast_stats_update(self):
+        """Query meme stats and broadcast them to the admin dashboard."""
+        meme_stats = await self.get_meme_stats()
+        await get_event_broadcaster().broadcast_stats_update({"meme_stats": meme_stats})
+
+    async def create_rankings_bulk(
+        self, rows: Iterable[Tuple[int, int, int]], session_id: int = None
+    ) -> int:
+        """Create or update many rankings in a single transaction.
+
+        Unlike create_ranking, no per-rating events are sent; a single stats
+        update is broadcast for the whole batch.
+
+        Args:
+            rows: (user_id, meme_id, score) triples
+            session_id: Session ID (if None, uses active session)
+
+        Returns:
+            Number of rankings written
+        """
+        # Get active session if not provided
+        if session_id is None:
+            active_session = await self.get_active_session()
+            if not active_session:
+                raise ValueError("No active session found")
+            session_id = active_session["id"]
+
+        async with self.get_connection() as conn:
+            cursor = await conn.executemany(
+                self._UPSERT_RANKING_SQL,
+                (
+                    (user_id, meme_id, score, session_id)
+                    for user_id, meme_id, score in rows
+                ),
+            )
+            await conn.commit()
+            count = cursor.rowcount
+
+        # Broadcast one stats update for the batch, off the request path
+        from .events import schedule_broadcast
+
+        schedule_broadcast(self._broadcast_stats_update)
 
-            return ranking_id
+        return count
 
     async def get_user_rankings(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all rankings for a user.
@@ -1,9 +1,13 @@
 """Event system for real-time updates in memes-ranker application."""
 
+import asyncio
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, Union
 from dataclasses import dataclass, asdict
-import json
+
+import orjson
+
+from .logging_config import get_logger
 
 
 class EventType(str, Enum):
@@ -34,17 +38,37 @@ class Event:
     data: Dict[str, Any]
     timestamp: str = None
 
-    def to_json(self) -> str:
-        """Convert event to JSON string."""
-        return json.dumps(asdict(self))
+    def to_json(self) -> bytes:
+        """Convert event to UTF-8 encoded JSON."""
+        return orjson.dumps(asdict(self))
 
     @classmethod
-    def from_json(cls, json_str: str) -> "Event":
-        """Create event from JSON string."""
-        data = json.loads(json_str)
+    def from_json(cls, json_str: Union[str, bytes]) -> "Event":
+        """Create event from JSON string or bytes."""
+        data = orjson.loads(json_str)
         return cls(**data)
 
 
+# Background broadcast tasks, referenced until done so they aren't collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _safe_broadcast(broadcast, *args):
+    """Run a broadcast coroutine, logging instead of raising on failure."""
+    try:
+        await broadcast(*args)
+    except Exception:
+        logger = get_logger(__name__)
+        logger.exception("Broadcast failed", broadcast=broadcast.__name__)
+
+
+def schedule_broadcast(broadcast, *args):
+    """Fan out a WebSocket broadcast without blocking the HTTP response."""
+    task = asyncio.create_task(_safe_broadcast(broadcast, *args))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 class EventBroadcaster:
     """Handles event broadcasting to WebSocket connections."""
 
@@ -62,11 +86,11 @@ class EventBroadcaster:
         if not self.websocket_manager:
             return
 
-        event = Event(type=event_type, data=session_data)
+        # Encode once; the same payload goes to every connection in both groups
+        message = Event(type=event_type, data=session_data).to_json()
 
-        # Broadcast to both admin and users
-        await self.websocket_manager.broadcast_to_group("admin", event.to_json())
-        await self.websocket_manager.broadcast_to_group("users", event.to_json())
+        # Broadcast to both admin and users in one pass
+        self.websocket_manager.broadcast_to_all(message)
 
     async def broadcast_rating_event(
         self, event_type: EventType, rating_data: Dict[str, Any]
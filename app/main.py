@@ -1,8 +1,9 @@
 """Main FastAPI application for memes-ranker."""
 
-import os
+import asyncio
+import sqlite3
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Union
 
 from fastapi import (
     Depends,
@@ -14,14 +15,21 @@ from fastapi import (
     WebSocket,
     WebSocketDisconnect,
 )
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
-from .auth import authenticate_admin, create_admin_token, get_current_admin
+from .auth import (
+    USER_SESSION_EXPIRE_DAYS,
+    authenticate_admin,
+    create_admin_token,
+    create_user_session_cookie,
+    get_current_admin,
+    verify_user_session_cookie,
+)
 from .database import db
-from .events import event_broadcaster
+from .events import event_broadcaster, schedule_broadcast
 from .logging_config import (
     get_frontend_loggers,
     get_logger,
@@ -36,6 +44,7 @@ from .utils import (
     generate_user_name,
     get_app_config,
     get_meme_files,
+    get_settings,
 )
 from .websocket_manager import websocket_manager
 
@@ -48,20 +57,37 @@ app = FastAPI(
     title="Memes Ranker",
     description="A FastAPI application for ranking memes",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Setup error logging middleware
 setup_fastapi_error_logging(app)
 
-# Create directories
-Path("static").mkdir(exist_ok=True)
-Path("static/css").mkdir(exist_ok=True)
-Path("static/js").mkdir(exist_ok=True)
-Path("static/memes").mkdir(exist_ok=True)
-Path("templates").mkdir(exist_ok=True)
+# Directories are created once on startup rather than on every import
+_dirs_ready = False
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache successful responses indefinitely."""
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+    cache_control = "public, max-age=31536000, immutable"
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = self.cache_control
+        return response
+
+
+# Mount static files (directory is verified lazily, after startup creates it).
+# Meme images are never rewritten in place, so they get long-lived caching;
+# this mount must come before the generic /static one to take precedence.
+app.mount(
+    "/static/memes",
+    CachedStaticFiles(directory="static/memes", check_dir=False),
+    name="memes",
+)
+app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
@@ -82,7 +108,7 @@ async def websocket_admin_endpoint(websocket: WebSocket):
             # Listen for incoming messages (mainly for ping/pong)
             data = await websocket.receive_text()
             # For now, just echo back (can be enhanced for bidirectional communication)
-            await websocket_manager.send_personal_message(
+            await websocket_manager.send_personal_json(
                 websocket, {"type": "echo", "data": data}
             )
     except WebSocketDisconnect:
@@ -100,7 +126,7 @@ async def websocket_user_endpoint(websocket: WebSocket):
             # Listen for incoming messages
             data = await websocket.receive_text()
             # Echo back for now
-            await websocket_manager.send_personal_message(
+            await websocket_manager.send_personal_json(
                 websocket, {"type": "echo", "data": data}
             )
     except WebSocketDisconnect:
@@ -123,6 +149,45 @@ def get_user_session(request: Request) -> Optional[dict]:
     return {"session_token": session_token}
 
 
+async def get_current_user(request: Request) -> tuple[Optional[dict], bool]:
+    """Resolve the current user, preferring the signed cookie over the database.
+
+    Returns:
+        Tuple of (user data or None, whether the signed cookie needs re-issuing)
+    """
+    session_token = request.cookies.get("session_token")
+    if not session_token:
+        return None, False
+
+    user_cookie = request.cookies.get("user_session")
+    if user_cookie:
+        user = verify_user_session_cookie(user_cookie, session_token)
+        if user:
+            return user, False
+
+    # Cookie missing or invalid - fall back to the database
+    user = await db.get_user_by_token(session_token)
+    return user, user is not None
+
+
+async def get_request_active_session(request: Request) -> Optional[dict]:
+    """Get the active session, looked up at most once per request."""
+    if not hasattr(request.state, "active_session"):
+        request.state.active_session = await db.get_active_session()
+    return request.state.active_session
+
+
+def set_user_session_cookie(response: Response, user: dict, session_token: str):
+    """Attach the signed user session cookie to a response."""
+    response.set_cookie(
+        key="user_session",
+        value=create_user_session_cookie(user["id"], user["name"], session_token),
+        max_age=USER_SESSION_EXPIRE_DAYS * 24 * 60 * 60,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+    )
+
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -134,7 +199,7 @@ async def index(request: Request):
         user_name = generate_user_name()
         session_token = generate_session_token()
 
-        await db.create_user(user_name, session_token)
+        user_id = await db.create_user(user_name, session_token)
 
         # Create response with cookie
         response = templates.TemplateResponse(
@@ -144,7 +209,7 @@ async def index(request: Request):
                 "user_name": user_name,
                 "memes": [],
                 "current_meme": None,
-                "qr_code_url": os.getenv("QR_CODE_URL", "https://memes.bieda.it"),
+                "qr_code_url": get_settings().qr_code_url,
             },
         )
         response.set_cookie(
@@ -154,22 +219,26 @@ async def index(request: Request):
             httponly=True,
             secure=False,  # Set to True in production with HTTPS
         )
+        set_user_session_cookie(
+            response, {"id": user_id, "name": user_name}, session_token
+        )
         return response
 
     # Get existing user
-    user = await db.get_user_by_token(session_token)
+    user, refresh_cookie = await get_current_user(request)
     if not user:
         # Invalid token, redirect to clear cookie
         response = RedirectResponse(url="/", status_code=302)
         response.delete_cookie("session_token")
+        response.delete_cookie("user_session")
         return response
 
     # Check if there's an active session
-    active_session = await db.get_active_session()
+    active_session = await get_request_active_session(request)
 
     # If no active session, show waiting screen
     if not active_session:
-        return templates.TemplateResponse(
+        response = templates.TemplateResponse(
             "index.html",
             {
                 "request": request,
@@ -179,9 +248,12 @@ async def index(request: Request):
                 "current_meme": None,
                 "user_rankings": [],
                 "active_session": None,
-                "qr_code_url": os.getenv("QR_CODE_URL", "https://memes.bieda.it"),
+                "qr_code_url": get_settings().qr_code_url,
             },
         )
+        if refresh_cookie:
+            set_user_session_cookie(response, user, session_token)
+        return response
 
     # Get active memes
     memes = await db.get_active_memes()
@@ -199,7 +271,7 @@ async def index(request: Request):
             current_meme = meme
             break
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "index.html",
         {
             "request": request,
@@ -209,43 +281,101 @@ async def index(request: Request):
             "current_meme": current_meme,
             "user_rankings": user_rankings,
             "active_session": active_session,
-            "qr_code_url": os.getenv("QR_CODE_URL", "https://memes.bieda.it"),
+            "qr_code_url": get_settings().qr_code_url,
         },
     )
+    if refresh_cookie:
+        set_user_session_cookie(response, user, session_token)
+    return response
 
 
-@app.post("/rank")
-async def rank_meme(request: Request, ranking: RankingRequest):
-    """Submit a meme ranking."""
+async def _submit_rankings(
+    request: Request, response: Response, rankings: List[RankingRequest]
+) -> Union[Response, int]:
+    """Validate the requester and write their rankings in the active session.
+
+    A single ranking goes through create_ranking (with its new-rating event);
+    several are written by create_rankings_bulk in one transaction.
+
+    Returns:
+        A response to send instead of success, or the number of rankings written
+    """
     session_token = request.cookies.get("session_token")
     if not session_token:
         raise HTTPException(status_code=401, detail="No session token")
 
-    user = await db.get_user_by_token(session_token)
+    user, _ = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid session token")
 
     # Check if there's an active session
-    active_session = await db.get_active_session()
+    active_session = await get_request_active_session(request)
     if not active_session:
         raise HTTPException(
             status_code=403,
             detail="No active session. Please wait for an admin to start a session.",
         )
 
-    # Validate score
-    if not (0 <= ranking.score <= 10):
+    # Validate scores
+    if not rankings:
+        raise HTTPException(status_code=400, detail="No rankings submitted")
+    if not all(0 <= ranking.score <= 10 for ranking in rankings):
         raise HTTPException(status_code=400, detail="Score must be between 0 and 10")
 
-    # Create/update ranking
-    await db.create_ranking(user["id"], ranking.meme_id, ranking.score)
+    async def write(user_id: int) -> int:
+        if len(rankings) == 1:
+            ranking = rankings[0]
+            await db.create_ranking(
+                user_id, ranking.meme_id, ranking.score, session_id=active_session["id"]
+            )
+            return 1
+        return await db.create_rankings_bulk(
+            [(user_id, ranking.meme_id, ranking.score) for ranking in rankings],
+            session_id=active_session["id"],
+        )
 
-    # Broadcast updated stats to admin dashboard
-    await websocket_manager.broadcast_connection_stats()
+    # Create/update rankings
+    try:
+        written = await write(user["id"])
+    except sqlite3.IntegrityError:
+        # The signed cookie is trusted without a lookup, so it may name a user
+        # whose row is gone (e.g. the database was reset); re-check the token
+        db_user = await db.get_user_by_token(session_token)
+        if db_user is None:
+            invalid = ORJSONResponse(
+                status_code=401, content={"detail": "Invalid session token"}
+            )
+            invalid.delete_cookie("session_token")
+            invalid.delete_cookie("user_session")
+            return invalid
+        raise
+
+    # Broadcast updated stats to admin dashboard (debounced by the manager)
+    websocket_manager.invalidate_stats_cache()
+    websocket_manager.broadcast_connection_stats()
+    return written
 
+
+@app.post("/rank")
+async def rank_meme(request: Request, response: Response, ranking: RankingRequest):
+    """Submit a meme ranking."""
+    result = await _submit_rankings(request, response, [ranking])
+    if isinstance(result, Response):
+        return result
     return {"status": "success", "message": "Ranking submitted"}
 
 
+@app.post("/rank/bulk")
+async def rank_memes_bulk(
+    request: Request, response: Response, rankings: List[RankingRequest]
+):
+    """Submit several meme rankings, written in one transaction."""
+    result = await _submit_rankings(request, response, rankings)
+    if isinstance(result, Response):
+        return result
+    return {"status": "success", "message": "Rankings submitted", "count": result}
+
+
 @app.get("/admin", response_class=HTMLResponse)
 async def admin_login(request: Request):
     """Admin login page."""
@@ -277,13 +407,16 @@ async def admin_login_post(password: str = Form(...)):
 
 
 @app.get("/admin/dashboard", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, admin: dict = Depends(get_current_admin)):
+async def admin_dashboard(
+    request: Request,
+    admin: dict = Depends(get_current_admin),
+    active_session: Optional[dict] = Depends(get_request_active_session),
+):
     """Admin dashboard."""
     logger = get_logger(__name__)
     logger.info("Admin dashboard accessed", admin_user=admin["username"])
     # Get statistics
     meme_stats = await db.get_meme_stats()
-    active_session = await db.get_active_session()
 
     # Get session statistics if there's an active session
     session_stats = None
@@ -304,7 +437,7 @@ async def admin_dashboard(request: Request, admin: dict = Depends(get_current_ad
             "active_session": active_session,
             "session_stats": session_stats,
             "completed_sessions": completed_sessions,
-            "qr_code_url": os.getenv("QR_CODE_URL", "https://memes.bieda.it"),
+            "qr_code_url": get_settings().qr_code_url,
         },
     )
 
@@ -316,18 +449,21 @@ async def create_session(
     """Create a new session."""
     session_id = await db.create_session(session.name)
     await db.start_session(session_id)
+    websocket_manager.invalidate_stats_cache()
     return {"status": "success", "session_id": session_id}
 
 
 @app.post("/admin/session/finish")
-async def finish_session(admin: dict = Depends(get_current_admin)):
+async def finish_session(
+    admin: dict = Depends(get_current_admin),
+    active_session: Optional[dict] = Depends(get_request_active_session),
+):
     """Finish the current active session."""
-    active_session = await db.get_active_session()
-
     if not active_session:
         raise HTTPException(status_code=404, detail="No active session found")
 
     await db.end_session(active_session["id"])
+    websocket_manager.invalidate_stats_cache()
     return {"status": "success", "message": "Session finished successfully"}
 
 
@@ -347,16 +483,12 @@ async def populate_memes(admin: dict = Depends(get_current_admin)):
         await db.set_meme_active(meme["id"], False)
 
     # Add new memes
-    for filename in meme_files:
-        path = f"/static/memes/{filename}"
-        await db.create_meme(filename, path)
+    await db.create_memes_bulk(
+        (filename, f"/static/memes/{filename}") for filename in meme_files
+    )
 
     # Broadcast memes populated event
-    try:
-        await event_broadcaster.broadcast_memes_populated(len(meme_files))
-    except Exception as e:
-        logger = get_logger(__name__)
-        logger.error("Failed to broadcast memes populated event", error=str(e))
+    schedule_broadcast(event_broadcaster.broadcast_memes_populated, len(meme_files))
 
     return {"status": "success", "memes_added": len(meme_files)}
 
@@ -468,13 +600,12 @@ async def reveal_next_position(
                 break
 
         # Broadcast to WebSocket clients
-        try:
-            await websocket_manager.broadcast_reveal_update(
-                session_id, new_position, meme_data
-            )
-        except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Error broadcasting reveal update: {e}")
+        schedule_broadcast(
+            websocket_manager.broadcast_reveal_update,
+            session_id,
+            new_position,
+            meme_data,
+        )
 
         return {
             "position": new_position,
@@ -650,10 +781,11 @@ async def get_stats():
 
 
 @app.get("/api/session/stats")
-async def get_session_stats(admin: dict = Depends(get_current_admin)):
+async def get_session_stats(
+    admin: dict = Depends(get_current_admin),
+    active_session: Optional[dict] = Depends(get_request_active_session),
+):
     """API endpoint to get session statistics with real-time data."""
-    active_session = await db.get_active_session()
-
     if not active_session:
         return {"error": "No active session"}
 
@@ -681,9 +813,10 @@ async def get_session_stats(admin: dict = Depends(get_current_admin)):
 
 
 @app.get("/api/session/status")
-async def get_session_status():
+async def get_session_status(
+    active_session: Optional[dict] = Depends(get_request_active_session),
+):
     """Public API endpoint to check if there's an active session."""
-    active_session = await db.get_active_session()
     return {
         "has_active_session": active_session is not None,
         "session_name": active_session["name"] if active_session else None,
@@ -703,6 +836,9 @@ async def receive_frontend_logs(request: Request, log_batch: FrontendLogBatch):
     client_ip = request.client.host if request.client else "unknown"
     user_agent = request.headers.get("user-agent", "unknown")
 
+    # One server timestamp for the whole batch; entries arrive together
+    server_timestamp = datetime.now().isoformat()
+
     # Process each log entry
     for log_entry in log_batch.logs:
         # Prepare log data
@@ -719,7 +855,7 @@ async def receive_frontend_logs(request: Request, log_batch: FrontendLogBatch):
             "metadata": log_entry.metadata,
             "stack_trace": log_entry.stack_trace,
             "client_ip": client_ip,
-            "server_timestamp": datetime.now().isoformat(),
+            "server_timestamp": server_timestamp,
         }
 
         # Add client info from batch
@@ -762,6 +898,19 @@ async def receive_frontend_logs(request: Request, log_batch: FrontendLogBatch):
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
+    global _dirs_ready
+    # Tasks that finish without suspending (e.g. broadcasts to idle writers)
+    # complete inline instead of being scheduled on the next loop iteration
+    asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
+    # Connection stats are computed off the connect/disconnect path
+    websocket_manager.start_stats_worker()
+
+    if not _dirs_ready:
+        for directory in ("static/css", "static/js", "static/memes", "templates"):
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        _dirs_ready = True
+
     # Populate memes if directory exists and has files
     meme_files = get_meme_files()
     if meme_files:
@@ -769,9 +918,15 @@ async def startup_event():
         if not existing_memes:
             logger = get_logger(__name__)
             logger.info("Populating memes from directory", meme_count=len(meme_files))
-            for filename in meme_files:
-                path = f"/static/memes/{filename}"
-                await db.create_meme(filename, path)
+            await db.create_memes_bulk(
+                (filename, f"/static/memes/{filename}") for filename in meme_files
+            )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work on shutdown."""
+    await websocket_manager.stop_stats_worker()
 
 
 if __name__ == "__main__":
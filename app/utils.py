@@ -2,35 +2,94 @@
 
 import os
 import secrets
+from dataclasses import dataclass
+from functools import lru_cache, partial
 from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import qrcode
 from coolname import generate_slug
+from qrcode.image.pil import PilImage
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 
-def generate_user_name() -> str:
+@dataclass(frozen=True)
+class Settings:
+    """Application settings, parsed from the environment once."""
+
+    app_host: str
+    app_port: int
+    app_debug: bool
+    admin_password: str
+    jwt_secret_key: str
+    database_path: str
+    memes_dir: str
+    qr_code_url: str
+    bcrypt_rounds: int
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from environment variables."""
+        return cls(
+            app_host=os.getenv("APP_HOST", "0.0.0.0"),
+            app_port=int(os.getenv("APP_PORT", "8000")),
+            app_debug=os.getenv("APP_DEBUG", "true").lower() == "true",
+            admin_password=os.getenv("ADMIN_PASSWORD", "admin123"),
+            jwt_secret_key=os.getenv(
+                "JWT_SECRET_KEY", "fallback_secret_key_change_in_production"
+            ),
+            database_path=os.getenv("DATABASE_PATH", "./data/memes.db"),
+            memes_dir=os.getenv("MEMES_DIR", "./static/memes"),
+            qr_code_url=os.getenv("QR_CODE_URL", "https://memes.bieda.it"),
+            bcrypt_rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Get cached application settings.
+
+    Call ``get_settings.cache_clear()`` after changing the environment
+    to pick up new values.
+
+    Returns:
+        Application settings
+    """
+    return Settings.from_env()
+
+
+# Default random sources; tests patch these for deterministic values
+_slug_rng: Callable[[], str] = partial(generate_slug, 2)
+_token_rng: Callable[[], str] = partial(secrets.token_urlsafe, 32)
+
+
+def generate_user_name(rng: Optional[Callable[[], str]] = None) -> str:
     """Generate a fancy user name using coolname library.
 
+    Args:
+        rng: Callable returning a hyphenated slug. Defaults to coolname
 
     Returns:
-        A fancy two-word user name like "brave-falcon"
+        A fancy two-word user name like "Brave Falcon"
     """
-    return " ".join([word.capitalize() for word in generate_slug(2).split("-")])
+    slug = (rng or _slug_rng)()
+    return " ".join([word.capitalize() for word in slug.split("-")])
 
 
-def generate_session_token() -> str:
+def generate_session_token(rng: Optional[Callable[[], str]] = None) -> str:
     """Generate a secure session token.
 
+    Args:
+        rng: Callable returning a token. Defaults to secrets.token_urlsafe
+
     Returns:
         A secure random token for user sessions
     """
-    return secrets.token_urlsafe(32)
+    return (rng or _token_rng)()
 
 
 def generate_qr_code(url: Optional[str] = None) -> bytes:
@@ -43,20 +102,33 @@ def generate_qr_code(url: Optional[str] = None) -> bytes:
         QR code image as bytes (PNG format)
     """
     if url is None:
-        url = os.getenv("QR_CODE_URL", "https://memes.bieda.it")
+        url = get_settings().qr_code_url
+    return _render_qr_code(url)
+
+
+@lru_cache(maxsize=128)
+def _render_qr_code(url: str) -> bytes:
+    """Render a QR code PNG for url; pure, so repeated URLs are cached.
+
+    Args:
+        url: URL to encode in QR code
 
-    # Create QR code
+    Returns:
+        QR code image as bytes (PNG format)
+    """
+    # Create QR code; the version is left to fit() since most URLs exceed
+    # version 1 capacity, and the image factory is bound up front
     qr = qrcode.QRCode(
-        version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
         box_size=10,
         border=4,
+        image_factory=PilImage,
     )
     qr.add_data(url)
     qr.make(fit=True)
 
-    # Create image
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Create image (PilImage defaults to black on white)
+    img = qr.make_image()
 
     # Convert to bytes
     img_bytes = BytesIO()
@@ -72,8 +144,7 @@ def get_memes_directory() -> Path:
     Returns:
         Path to memes directory
     """
-    memes_dir = os.getenv("MEMES_DIR", "./static/memes")
-    return Path(memes_dir)
+    return Path(get_settings().memes_dir)
 
 
 def get_meme_files() -> list[str]:
@@ -103,7 +174,7 @@ def get_database_path() -> str:
     Returns:
         Database file path
     """
-    return os.getenv("DATABASE_PATH", "./data/memes.db")
+    return get_settings().database_path
 
 
 def get_admin_password() -> str:
@@ -112,7 +183,7 @@ def get_admin_password() -> str:
     Returns:
         Admin password
     """
-    return os.getenv("ADMIN_PASSWORD", "admin123")
+    return get_settings().admin_password
 
 
 def get_jwt_secret() -> str:
@@ -121,7 +192,7 @@ def get_jwt_secret() -> str:
     Returns:
         JWT secret key
     """
-    return os.getenv("JWT_SECRET_KEY", "fallback_secret_key_change_in_production")
+    return get_settings().jwt_secret_key
 
 
 def get_app_config() -> dict:
@@ -130,8 +201,9 @@ def get_app_config() -> dict:
     Returns:
         Application configuration dictionary
     """
+    settings = get_settings()
     return {
-        "host": os.getenv("APP_HOST", "0.0.0.0"),
-        "port": int(os.getenv("APP_PORT", "8000")),
-        "debug": os.getenv("APP_DEBUG", "true").lower() == "true",
+        "host": settings.app_host,
+        "port": settings.app_port,
+        "debug": settings.app_debug,
     }
@@ -1,10 +1,13 @@
 """WebSocket connection manager for real-time updates."""
 
 import asyncio
-import json
-from typing import Dict, Set
-from fastapi import WebSocket, WebSocketDisconnect
-from datetime import datetime
+import contextlib
+import time
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+import orjson
 
 from .logging_config import get_logger
 
@@ -14,13 +17,46 @@ logger = get_logger(__name__)
 class WebSocketManager:
     """Manages WebSocket connections for real-time updates."""
 
+    # Window in which connection stats requests are coalesced into one broadcast
+    STATS_DEBOUNCE_SECONDS = 0.1
+
+    # Messages a client may fall behind by before it is disconnected
+    SEND_QUEUE_SIZE = 256
+
+    # How long session data read for connection stats may be reused
+    ACTIVE_SESSION_TTL_NS = 1_000_000_000
+    SESSION_STATS_TTL_NS = 250_000_000
+
+    # Ping frames only differ by timestamp, so they are assembled by hand
+    _PING_PREFIX = b'{"type":"ping","timestamp":'
+
     def __init__(self):
-        # Group connections by type (admin, users)
-        self.connections: Dict[str, Set[WebSocket]] = {"admin": set(), "users": set()}
+        # Group connections by type (admin, users). Lists iterate and snapshot
+        # cheaply; the index map gives O(1) membership and swap-remove.
+        self.connections: Dict[str, List[WebSocket]] = {"admin": [], "users": []}
+        self._index: Dict[str, Dict[WebSocket, int]] = {
+            group: {} for group in self.connections
+        }
+
+        # Running per-group connection counts, updated with the lists above
+        self._counts: Dict[str, int] = {group: 0 for group in self.connections}
+        self._groups_tuple = tuple(self.connections)
 
         # Track connection metadata
         self.connection_info: Dict[WebSocket, Dict] = {}
 
+        # Debounced connection stats broadcasting (see broadcast_connection_stats)
+        self._stats_dirty: Optional[asyncio.Event] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        self._last_stats: Optional[dict] = None
+
+        # (expires_at_ns, ...) caches for the stats database lookups
+        self._session_cache: Tuple[int, Optional[dict]] = (0, None)
+        self._session_stats_cache: Tuple[int, Optional[int], dict] = (0, None, {})
+
+        # Keep references to fire-and-forget tasks so they are not collected
+        self._background_tasks: Set[asyncio.Task] = set()
+
     async def connect(
         self, websocket: WebSocket, client_type: str, client_id: str = None
     ):
@@ -29,32 +65,53 @@ class WebSocketManager:
 
         # Add to appropriate group
         if client_type in self.connections:
-            self.connections[client_type].add(websocket)
-
-            # Store connection metadata
-            self.connection_info[websocket] = {
+            index = self._index[client_type]
+            if websocket not in index:
+                index[websocket] = len(self.connections[client_type])
+                self.connections[client_type].append(websocket)
+                self._counts[client_type] += 1
+
+            # Store connection metadata. Broadcasts are queued per connection
+            # and sent by a dedicated writer task, started once the welcome
+            # message is out so it always arrives first.
+            info = {
                 "type": client_type,
                 "id": client_id,
-                "connected_at": datetime.now().isoformat(),
+                "connected_at": time.time_ns(),
+                "queue": asyncio.Queue(maxsize=self.SEND_QUEUE_SIZE),
             }
+            self.connection_info[websocket] = info
 
             logger.info(f"WebSocket connected: {client_type} client ({client_id})")
 
             # Send welcome message
-            await self.send_personal_message(
+            await self.send_personal_bytes(
                 websocket,
-                {
-                    "type": "connection_established",
-                    "data": {
-                        "client_type": client_type,
-                        "client_id": client_id,
-                        "timestamp": datetime.now().isoformat(),
-                    },
-                },
+                orjson.dumps(
+                    {
+                        "type": "connection_established",
+                        "data": {
+                            "client_type": client_type,
+                            "client_id": client_id,
+                            "timestamp": time.time_ns(),
+                        },
+                    }
+                ),
             )
 
+            # The welcome send may have failed and disconnected the client
+            if self.connection_info.get(websocket) is not info:
+                return
+            info["writer"] = asyncio.create_task(
+                self._writer_loop(websocket, info["queue"])
+            )
+
+            # A new admin has not seen any stats yet, so never skip the next one
+            if client_type == "admin":
+                self._last_stats = None
+
             # Broadcast updated connection stats to admins
-            await self.broadcast_connection_stats()
+            self.broadcast_connection_stats()
         else:
             logger.warning(f"Unknown client type: {client_type}")
             await websocket.close(code=1000)
@@ -63,52 +120,117 @@ class WebSocketManager:
         """Remove a WebSocket connection."""
         # Find and remove from appropriate group
         for group_name, connections in self.connections.items():
-            if websocket in connections:
-                connections.remove(websocket)
+            index = self._index[group_name]
+            if websocket in index:
+                # Swap-remove: move the last connection into the freed slot
+                position = index.pop(websocket)
+                last = connections.pop()
+                if last is not websocket:
+                    connections[position] = last
+                    index[last] = position
+                self._counts[group_name] -= 1
                 break
 
-        # Remove metadata
+        # Remove metadata and stop the writer (unless it is the one calling us)
         info = self.connection_info.pop(websocket, {})
         client_type = info.get("type", "unknown")
         client_id = info.get("id", "unknown")
+        writer = info.get("writer")
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
 
         logger.info(f"WebSocket disconnected: {client_type} client ({client_id})")
 
         # Broadcast updated connection stats to admins
-        await self.broadcast_connection_stats()
+        self.broadcast_connection_stats()
 
-    async def send_personal_message(self, websocket: WebSocket, message: dict):
-        """Send message to a specific WebSocket connection."""
+    async def send_personal_json(self, websocket: WebSocket, message: dict):
+        """Encode a message and send it to a specific WebSocket connection."""
+        await self.send_personal_bytes(websocket, orjson.dumps(message))
+
+    async def send_personal_bytes(self, websocket: WebSocket, message: bytes):
+        """Send an encoded JSON message to a specific WebSocket connection."""
         try:
-            if isinstance(message, dict):
-                message = json.dumps(message)
-            await websocket.send_text(message)
+            await websocket.send_bytes(message)
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
             await self.disconnect(websocket)
 
-    async def broadcast_to_group(self, group: str, message: str):
-        """Broadcast message to all connections in a group."""
+    async def broadcast_to_group(self, group: str, message: bytes):
+        """Broadcast an encoded JSON message to all connections in a group."""
+        self.broadcast_nowait(group, message)
+
+    def broadcast_nowait(self, group: str, message: bytes):
+        """Queue an encoded JSON message for every connection in a group.
+
+        Returns immediately; each connection's writer task does the sending.
+        """
         if group not in self.connections:
             logger.warning(f"Unknown group: {group}")
             return
 
-        connections = self.connections[
-            group
-        ].copy()  # Copy to avoid modification during iteration
+        self._enqueue(self.connections[group], message)
+
+    def broadcast_to_all(self, message: bytes):
+        """Queue an encoded JSON message for every connection in every group.
+
+        A single pass over all groups; returns immediately like broadcast_nowait.
+        """
+        self._enqueue(chain.from_iterable(self.connections.values()), message)
 
-        # Send to all connections in parallel
-        tasks = []
+    def _enqueue(self, connections: Iterable[WebSocket], message: bytes):
+        """Put a message on the send queue of each given connection."""
+        connection_info = self.connection_info
+        slow_clients = []
         for connection in connections:
-            tasks.append(self._safe_send(connection, message))
+            info = connection_info.get(connection)
+            if info is None or info.get("dropped"):
+                continue
+            try:
+                info["queue"].put_nowait(message)
+            except asyncio.QueueFull:
+                info["dropped"] = True
+                slow_clients.append((connection, info))
+
+        # Dropping mutates the connection lists, so only do it after iterating
+        # (with an eager task factory the disconnect runs immediately)
+        for connection, info in slow_clients:
+            self._drop_slow_client(connection, info)
+
+    def _drop_slow_client(self, websocket: WebSocket, info: dict):
+        """Disconnect a client that cannot keep up with its send queue."""
+        logger.warning(
+            f"Dropping slow WebSocket client: {info['type']} client ({info['id']})"
+        )
+        task = asyncio.create_task(self._close_slow_client(websocket))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+    async def _close_slow_client(self, websocket: WebSocket):
+        """Remove a slow client and close its socket."""
+        await self.disconnect(websocket)
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception as e:
+            logger.debug(f"Error closing slow WebSocket: {e}")
+
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Send queued messages to one WebSocket, handling disconnections.
 
-    async def _safe_send(self, websocket: WebSocket, message: str):
-        """Safely send message to WebSocket, handling disconnections."""
+        Messages that piled up while the previous send was in flight are
+        merged into a single JSON array frame. Sends are not gated by a shared
+        limit: one writer per connection already bounds concurrency, and a
+        shared limit would let stalled sockets block healthy ones.
+        """
         try:
-            await websocket.send_text(message)
+            while True:
+                message = await queue.get()
+                pending = queue.qsize()
+                if pending:
+                    batch = [message]
+                    batch += [queue.get_nowait() for _ in range(pending)]
+                    message = b"[" + b",".join(batch) + b"]"
+                await websocket.send_bytes(message)
         except WebSocketDisconnect:
             await self.disconnect(websocket)
         except Exception as e:
@@ -117,62 +239,134 @@ class WebSocketManager:
 
     async def broadcast_session_update(self, event_type: str, session_data: dict):
         """Broadcast session updates to all connected clients."""
-        message = json.dumps(
+        message = orjson.dumps(
             {
                 "type": event_type,
                 "data": session_data,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": time.time_ns(),
             }
         )
 
         # Broadcast to both admin and users
-        await self.broadcast_to_group("admin", message)
-        await self.broadcast_to_group("users", message)
+        self.broadcast_to_all(message)
 
     async def broadcast_reveal_update(
         self, session_id: int, position: int, meme_data: dict
     ):
         """Broadcast results reveal update to all connected clients."""
-        message = json.dumps(
+        message = orjson.dumps(
             {
                 "type": "reveal_update",
                 "session_id": session_id,
                 "position": position,
                 "meme_data": meme_data,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": time.time_ns(),
             }
         )
 
         # Broadcast to both admin and users
-        await self.broadcast_to_group("admin", message)
-        await self.broadcast_to_group("users", message)
+        self.broadcast_to_all(message)
 
     def get_connection_stats(self) -> dict:
         """Get current connection statistics."""
+        counts = self._counts
         return {
-            "total_connections": sum(
-                len(connections) for connections in self.connections.values()
-            ),
-            "admin_connections": len(self.connections["admin"]),
-            "user_connections": len(self.connections["users"]),
-            "groups": list(self.connections.keys()),
+            "total_connections": counts["admin"] + counts["users"],
+            "admin_connections": counts["admin"],
+            "user_connections": counts["users"],
+            "groups": self._groups_tuple,
         }
 
-    async def broadcast_connection_stats(self):
-        """Broadcast current connection stats to admin clients."""
+    def broadcast_connection_stats(self):
+        """Request a connection stats broadcast to admin clients.
+
+        Requests are coalesced: a background worker waits
+        ``STATS_DEBOUNCE_SECONDS`` after the first request, then computes and
+        sends the stats once, so connect/disconnect storms cost a single
+        database round-trip and broadcast per window.
+        """
+        self.start_stats_worker()
+        self._stats_dirty.set()
+
+    def start_stats_worker(self):
+        """Start the connection stats worker on the running event loop.
+
+        Called on application startup; a no-op if the worker is already
+        running on this loop.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._stats_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._stats_dirty = asyncio.Event()
+        self._stats_task = loop.create_task(self._stats_worker())
+
+    async def stop_stats_worker(self):
+        """Cancel the connection stats worker, e.g. on application shutdown."""
+        task, self._stats_task = self._stats_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _stats_worker(self):
+        """Send connection stats whenever they have been requested."""
+        dirty = self._stats_dirty
+        while True:
+            await dirty.wait()
+            await asyncio.sleep(self.STATS_DEBOUNCE_SECONDS)
+            dirty.clear()
+            await self._send_connection_stats()
+
+    def invalidate_stats_cache(self):
+        """Drop cached session data, e.g. after a vote or a session change."""
+        self._session_cache = (0, None)
+        self._session_stats_cache = (0, None, {})
+
+    async def _get_cached_active_session(self, db) -> Optional[dict]:
+        """Get the active session, reusing a recent lookup."""
+        now = time.time_ns()
+        expires_at, session = self._session_cache
+        if now < expires_at:
+            return session
+
+        session = await db.get_active_session()
+        self._session_cache = (now + self.ACTIVE_SESSION_TTL_NS, session)
+        return session
+
+    async def _get_cached_session_stats(self, db, session_id: int) -> dict:
+        """Get stats for a session, reusing a recent lookup."""
+        now = time.time_ns()
+        expires_at, cached_id, stats = self._session_stats_cache
+        if now < expires_at and cached_id == session_id:
+            return stats
+
+        stats = await db.get_session_stats(session_id)
+        self._session_stats_cache = (now + self.SESSION_STATS_TTL_NS, session_id, stats)
+        return stats
+
+    async def _send_connection_stats(self):
+        """Compute current connection stats and broadcast them to admins."""
         from .database import db
 
+        # Nobody to tell
+        if not self.connections["admin"]:
+            return
+
         # Get connection stats
         stats = self.get_connection_stats()
 
         # Get vote stats from database
         try:
             # Get active session and its stats
-            active_session = await db.get_active_session()
+            active_session = await self._get_cached_active_session(db)
             if not active_session:
                 return
 
-            session_stats = await db.get_session_stats(active_session["id"])
+            session_stats = await self._get_cached_session_stats(
+                db, active_session["id"]
+            )
             total_votes = session_stats.get("vote_count", 0)
             meme_count = session_stats.get("meme_count", 0)
 
@@ -189,10 +383,19 @@ class WebSocketManager:
                 "total_votes": total_votes,
                 "meme_count": meme_count,
                 "expected_votes": expected_votes,
-                "timestamp": datetime.now().isoformat(),
             }
 
-            message = json.dumps({"type": "connection_stats", "data": combined_stats})
+            # Skip the broadcast if admins already have these numbers
+            if combined_stats == self._last_stats:
+                return
+            self._last_stats = combined_stats
+
+            message = orjson.dumps(
+                {
+                    "type": "connection_stats",
+                    "data": {**combined_stats, "timestamp": time.time_ns()},
+                }
+            )
 
             # Only broadcast to admin connections
             await self.broadcast_to_group("admin", message)
@@ -202,12 +405,9 @@ class WebSocketManager:
 
     async def ping_all_connections(self):
         """Send ping to all connections to check health."""
-        ping_message = json.dumps(
-            {"type": "ping", "timestamp": datetime.now().isoformat()}
-        )
+        ping_message = self._PING_PREFIX + str(time.time_ns()).encode() + b"}"
 
-        for group in self.connections:
-            await self.broadcast_to_group(group, ping_message)
+        self.broadcast_to_all(ping_message)
 
 
 # Global WebSocket manager instance
@@ -0,0 +1,14 @@
+"""Gunicorn worker classes for memes-ranker application."""
+
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """Uvicorn worker pinned to the fast loop, HTTP and WebSocket backends."""
+
+    CONFIG_KWARGS = {
+        **BaseUvicornWorker.CONFIG_KWARGS,
+        "loop": "uvloop",
+        "http": "httptools",
+        "ws": "websockets",
+    }
@@ -9,7 +9,7 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
-worker_class = "uvicorn.workers.UvicornWorker"
+worker_class = "app.workers.UvicornWorker"  # uvloop + httptools + websockets
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -33,8 +33,9 @@ limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 
-# Preload application for better performance
-preload_app = True
+# Each worker imports the app itself, so the event loop, database and
+# WebSocket singletons are created inside the worker rather than the master
+preload_app = False
 
 # Restart workers periodically to prevent memory leaks
 max_requests = 1000
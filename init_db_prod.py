@@ -9,6 +9,10 @@ import os
 import sqlite3
 from pathlib import Path
 
+# Schema ships next to this script (/app/sql/schema.sql in the image); read it
+# once at import instead of on every call
+_SCHEMA_SQL = (Path(__file__).resolve().parent / "sql" / "schema.sql").read_text()
+
 
 def init_database_if_needed(db_path: str = "/app/data/memes.db"):
     """Initialize database if it doesn't exist."""
@@ -40,14 +44,6 @@ def init_database_if_needed(db_path: str = "/app/data/memes.db"):
         print(f"Database already exists at: {db_path}")
         return
 
-    # Read schema file
-    schema_path = Path("/app/sql/schema.sql")
-    if not schema_path.exists():
-        raise FileNotFoundError(f"Schema file not found: {schema_path}")
-
-    with open(schema_path, "r") as f:
-        schema_sql = f.read()
-
     # Test if we can create the database file
     try:
         # Create database connection
@@ -70,7 +66,7 @@ def init_database_if_needed(db_path: str = "/app/data/memes.db"):
         conn.execute("PRAGMA foreign_keys=ON")
 
         # Execute schema
-        conn.executescript(schema_sql)
+        conn.executescript(_SCHEMA_SQL)
 
         print(f"Database created successfully at: {db_path}")
         print("Schema initialized with tables: users, memes, rankings, sessions")
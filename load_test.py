@@ -3,6 +3,7 @@
 # requires-python = ">=3.13"
 # dependencies = [
 #     "aiohttp",
+#     "orjson",
 # ]
 # ///
 """
@@ -12,7 +13,9 @@ Tests the application's ability to handle concurrent users.
 
 import asyncio
 import aiohttp
+import orjson
 import random
+import statistics
 import time
 from typing import Dict, Any
 
@@ -25,8 +28,14 @@ class LoadTester:
         self.concurrent_users = concurrent_users
         self.results = []
 
-    async def simulate_user_session(self, user_id: int) -> Dict[str, Any]:
-        """Simulate a single user session with the application."""
+    async def simulate_user_session(
+        self, user_id: int, connector: aiohttp.BaseConnector
+    ) -> Dict[str, Any]:
+        """Simulate a single user session with the application.
+
+        Each user gets its own session and cookie jar, while TCP connections
+        come from the connector shared by all users.
+        """
         user_results = {
             "user_id": user_id,
             "requests": [],
@@ -34,28 +43,33 @@ class LoadTester:
             "total_time": 0,
         }
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # Create individual session for each user
         timeout = aiohttp.ClientTimeout(total=30)
         async with aiohttp.ClientSession(
-            timeout=timeout, cookie_jar=aiohttp.CookieJar()
+            connector=connector,
+            connector_owner=False,
+            timeout=timeout,
+            cookie_jar=aiohttp.CookieJar(),
         ) as session:
             try:
                 # 1. Load main page (get session cookie)
+                request_start = time.perf_counter()
                 async with session.get(f"{self.base_url}/") as response:
                     if response.status == 200:
                         user_results["requests"].append(
                             {
                                 "endpoint": "/",
                                 "status": 200,
-                                "time": time.time() - start_time,
+                                "time": time.perf_counter() - request_start,
                             }
                         )
                     else:
                         user_results["errors"] += 1
 
                 # 2. Check session status
+                request_start = time.perf_counter()
                 async with session.get(
                     f"{self.base_url}/api/session/status"
                 ) as response:
@@ -64,21 +78,22 @@ class LoadTester:
                             {
                                 "endpoint": "/api/session/status",
                                 "status": 200,
-                                "time": time.time() - start_time,
+                                "time": time.perf_counter() - request_start,
                             }
                         )
                     else:
                         user_results["errors"] += 1
 
                 # 3. Get memes list
+                request_start = time.perf_counter()
                 async with session.get(f"{self.base_url}/api/memes") as response:
                     if response.status == 200:
-                        memes_data = await response.json()
+                        memes_data = orjson.loads(await response.read())
                         user_results["requests"].append(
                             {
                                 "endpoint": "/api/memes",
                                 "status": 200,
-                                "time": time.time() - start_time,
+                                "time": time.perf_counter() - request_start,
                             }
                         )
 
@@ -91,6 +106,7 @@ class LoadTester:
                                     "score": random.randint(1, 10),
                                 }
 
+                                request_start = time.perf_counter()
                                 async with session.post(
                                     f"{self.base_url}/rank",
                                     json=ranking_data,
@@ -101,7 +117,8 @@ class LoadTester:
                                             {
                                                 "endpoint": "/rank",
                                                 "status": 200,
-                                                "time": time.time() - start_time,
+                                                "time": time.perf_counter()
+                                                - request_start,
                                             }
                                         )
                                     else:
@@ -113,13 +130,14 @@ class LoadTester:
                         user_results["errors"] += 1
 
                 # 5. Get statistics
+                request_start = time.perf_counter()
                 async with session.get(f"{self.base_url}/api/stats") as response:
                     if response.status == 200:
                         user_results["requests"].append(
                             {
                                 "endpoint": "/api/stats",
                                 "status": 200,
-                                "time": time.time() - start_time,
+                                "time": time.perf_counter() - request_start,
                             }
                         )
                     else:
@@ -129,7 +147,7 @@ class LoadTester:
                 user_results["errors"] += 1
                 user_results["exception"] = str(e)
 
-            user_results["total_time"] = time.time() - start_time
+            user_results["total_time"] = time.perf_counter() - start_time
             return user_results
 
     async def run_load_test(self) -> Dict[str, Any]:
@@ -137,16 +155,26 @@ class LoadTester:
         print(f"Starting load test with {self.concurrent_users} concurrent users...")
         print(f"Target URL: {self.base_url}")
 
-        # Create tasks for all users
-        tasks = []
-        for user_id in range(self.concurrent_users):
-            task = asyncio.create_task(self.simulate_user_session(user_id))
-            tasks.append(task)
+        # One keep-alive connection pool for all simulated users
+        connector = aiohttp.TCPConnector(
+            limit=0, ttl_dns_cache=300, keepalive_timeout=30, force_close=False
+        )
 
-        # Run all tasks concurrently
-        test_start = time.time()
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        test_duration = time.time() - test_start
+        try:
+            # Create tasks for all users
+            tasks = []
+            for user_id in range(self.concurrent_users):
+                task = asyncio.create_task(
+                    self.simulate_user_session(user_id, connector)
+                )
+                tasks.append(task)
+
+            # Run all tasks concurrently
+            test_start = time.perf_counter()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            test_duration = time.perf_counter() - test_start
+        finally:
+            await connector.close()
 
         # Process results
         successful_users = 0
@@ -171,6 +199,16 @@ class LoadTester:
         max_response_time = max(response_times) if response_times else 0
         min_response_time = min(response_times) if response_times else 0
 
+        # Percentiles are the numbers that matter for user-facing latency
+        p50_response_time = p95_response_time = p99_response_time = 0
+        if response_times:
+            percentiles = statistics.quantiles(
+                response_times, n=100, method="inclusive"
+            )
+            p50_response_time = percentiles[49]
+            p95_response_time = percentiles[94]
+            p99_response_time = percentiles[98]
+
         requests_per_second = total_requests / test_duration if test_duration > 0 else 0
 
         test_results = {
@@ -183,6 +221,9 @@ class LoadTester:
             "avg_response_time": avg_response_time,
             "min_response_time": min_response_time,
             "max_response_time": max_response_time,
+            "p50_response_time": p50_response_time,
+            "p95_response_time": p95_response_time,
+            "p99_response_time": p99_response_time,
             "error_rate": (total_errors / total_requests * 100)
             if total_requests > 0
             else 0,
@@ -205,6 +246,9 @@ class LoadTester:
         print(f"Avg Response Time: {results['avg_response_time']:.3f}s")
         print(f"Min Response Time: {results['min_response_time']:.3f}s")
         print(f"Max Response Time: {results['max_response_time']:.3f}s")
+        print(f"P50 Response Time: {results['p50_response_time']:.3f}s")
+        print(f"P95 Response Time: {results['p95_response_time']:.3f}s")
+        print(f"P99 Response Time: {results['p99_response_time']:.3f}s")
         print("=" * 60)
 
         # Performance assessment
@@ -269,11 +313,13 @@ async def main():
         print("\n" + "=" * 60)
         print("SCALING TEST SUMMARY")
         print("=" * 60)
-        print(f"{'Users':<8} {'RPS':<12} {'Errors':<8} {'Avg Time':<12}")
+        print(
+            f"{'Users':<8} {'RPS':<12} {'Errors':<8} {'Avg Time':<12} {'P95 Time':<12}"
+        )
         print("-" * 60)
         for result in all_results:
             print(
-                f"{result['concurrent_users']:<8} {result['requests_per_second']:<12.1f} {result['error_rate']:<8.1f}% {result['avg_response_time']:<12.3f}s"
+                f"{result['concurrent_users']:<8} {result['requests_per_second']:<12.1f} {result['error_rate']:<8.1f}% {result['avg_response_time']:<12.3f}s {result['p95_response_time']:<12.3f}s"
             )
 
     else:
@@ -9,23 +9,26 @@ import os
 import sqlite3
 from pathlib import Path
 
+# Read the schema once, relative to this script rather than the working directory
+_SCHEMA_SQL = (Path(__file__).resolve().parent / "sql" / "schema.sql").read_text()
+
 
 def create_database(db_path: str = "data/memes.db"):
-    """Create database and initialize schema."""
-    # Create data directory if it doesn't exist
-    db_dir = Path(db_path).parent
-    db_dir.mkdir(parents=True, exist_ok=True)
+    """Create database and initialize schema.
 
-    # Read schema file
-    schema_path = Path("sql/schema.sql")
-    if not schema_path.exists():
-        raise FileNotFoundError(f"Schema file not found: {schema_path}")
+    ``db_path`` may also be a ``file:`` URI. An in-memory (memdb)
+    database only lives while a connection is open, so callers must keep
+    one open across this call.
+    """
+    is_uri = db_path.startswith("file:")
 
-    with open(schema_path, "r") as f:
-        schema_sql = f.read()
+    # Create data directory if it doesn't exist
+    if not is_uri:
+        db_dir = Path(db_path).parent
+        db_dir.mkdir(parents=True, exist_ok=True)
 
     # Create database connection
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, uri=is_uri)
 
     try:
         # Enable WAL mode for better concurrency
@@ -35,7 +38,7 @@ def create_database(db_path: str = "data/memes.db"):
         conn.execute("PRAGMA foreign_keys=ON")
 
         # Execute schema
-        conn.executescript(schema_sql)
+        conn.executescript(_SCHEMA_SQL)
 
         print(f"Database created successfully at: {db_path}")
         print("Schema initialized with tables: users, memes, rankings, sessions")
@@ -2,6 +2,24 @@
  * WebSocket Service for real-time updates in Memes Ranker
  */
 
+const wsTextDecoder = new TextDecoder();
+
+/**
+ * Return the text payload of a WebSocket message (text or binary frame)
+ */
+function decodeWebSocketData(data) {
+    return typeof data === 'string' ? data : wsTextDecoder.decode(data);
+}
+
+/**
+ * Parse a WebSocket message into a list of events; the server merges
+ * messages queued for a client into a single JSON array frame
+ */
+function parseWebSocketMessages(data) {
+    const parsed = JSON.parse(decodeWebSocketData(data));
+    return Array.isArray(parsed) ? parsed : [parsed];
+}
+
 class WebSocketService {
     constructor(endpoint, reconnectInterval = 5000) {
         this.endpoint = endpoint;
@@ -39,6 +57,8 @@ class WebSocketService {
 
             console.log(`[WebSocket] Connecting to ${wsUrl}`);
             this.websocket = new WebSocket(wsUrl);
+            // Server sends JSON as binary frames; decode them ourselves
+            this.websocket.binaryType = 'arraybuffer';
 
             // Set up event listeners
             this.websocket.addEventListener('open', this.onOpen);
@@ -63,17 +83,18 @@ class WebSocketService {
 
     onMessage(event) {
         try {
-            const message = JSON.parse(event.data);
-            console.log('[WebSocket] Message received:', message);
+            for (const message of parseWebSocketMessages(event.data)) {
+                console.log('[WebSocket] Message received:', message);
 
-            // Handle different message types
-            if (message.type) {
-                this.triggerEvent(message.type, message.data || message);
-            }
+                // Handle different message types
+                if (message.type) {
+                    this.triggerEvent(message.type, message.data || message);
+                }
 
-            // Handle ping/pong for connection health
-            if (message.type === 'ping') {
-                this.send({ type: 'pong', timestamp: new Date().toISOString() });
+                // Handle ping/pong for connection health
+                if (message.type === 'ping') {
+                    this.send({ type: 'pong', timestamp: new Date().toISOString() });
+                }
             }
 
         } catch (error) {
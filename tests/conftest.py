@@ -0,0 +1,15 @@
+"""Shared pytest configuration for memes-ranker tests.
+
+The repository root is put on the import path by ``pythonpath`` in
+pyproject.toml; this module only prepares the environment, which must
+happen before the application is imported.
+"""
+
+import os
+
+# Minimum bcrypt work factor; read once when app.auth is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+# Credentials the tests log in with
+os.environ["ADMIN_PASSWORD"] = "test_admin_password"
+os.environ["JWT_SECRET_KEY"] = "test_jwt_secret_key"
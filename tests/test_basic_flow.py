@@ -1,29 +1,81 @@
 """Basic integration tests for memes-ranker application."""
 
 import asyncio
+import atexit
+import functools
+import itertools
 import sys
 import os
-from pathlib import Path
-
-# Add the app directory to the path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import sqlite3
+import tempfile
+from unittest.mock import patch
 
 from app.database import Database
-from app.utils import generate_user_name, generate_session_token
+from app.utils import generate_user_name, generate_session_token, get_settings
 from setup_db import create_database
 
+# Key database names by pytest-xdist worker so parallel workers never collide
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+TEMPLATE_DB_PATH = os.path.join(
+    tempfile.gettempdir(), f"memes-ranker-template-{WORKER_ID}-{os.getpid()}.db"
+)
+
+
+@functools.cache
+def _template_database() -> str:
+    """Create the schema-only template database once per run."""
+    if os.path.exists(TEMPLATE_DB_PATH):
+        os.remove(TEMPLATE_DB_PATH)
+    create_database(TEMPLATE_DB_PATH)
+    atexit.register(os.remove, TEMPLATE_DB_PATH)
+
+    # A WAL header would be copied by the backup and break memdb opens
+    conn = sqlite3.connect(TEMPLATE_DB_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+    return TEMPLATE_DB_PATH
+
+
+# Open connections that keep each in-memory test database alive
+_anchors = {}
+
+
+def fresh_test_database(name: str) -> str:
+    """Load a fresh copy of the template into an in-memory database.
+
+    Args:
+        name: Name of the in-memory (memdb) database
+
+    Returns:
+        URI that Database can open
+    """
+    uri = f"file:/{name}_{WORKER_ID}?vfs=memdb"
+    previous = _anchors.pop(name, None)
+    if previous is not None:
+        previous.close()
+
+    anchor = sqlite3.connect(uri, uri=True)
+    template = sqlite3.connect(_template_database())
+    try:
+        template.backup(anchor)
+    finally:
+        template.close()
+    _anchors[name] = anchor
+    return uri
+
 
 async def test_database_operations():
     """Test basic database operations."""
-    print("Testing database operations...")
+    test_db_path = fresh_test_database("test")
+    async with Database(test_db_path) as db:
+        await check_database_operations(db)
 
-    # Setup test database
-    test_db_path = "data/test.db"
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-    create_database(test_db_path)
 
-    db = Database(test_db_path)
+async def check_database_operations(db: Database):
+    """Exercise basic database operations against db."""
+    print("Testing database operations...")
 
     # Test user creation
     user_name = generate_user_name()
@@ -86,24 +138,31 @@ def test_utility_functions():
 
     from app.utils import generate_user_name, generate_session_token, generate_qr_code
 
-    # Test name generation
-    name1 = generate_user_name()
-    name2 = generate_user_name()
-    assert name1 != name2  # Should be different
-    assert len(name1.split(" ")) == 2  # Should have two parts
+    # Test name generation with a deterministic slug source
+    slugs = (f"brave-falcon{n}" for n in itertools.count())
+    with patch("app.utils._slug_rng", lambda: next(slugs)):
+        name1 = generate_user_name()
+        name2 = generate_user_name()
+    assert name1 == "Brave Falcon0"
+    assert name2 == "Brave Falcon1"
+    assert len(generate_user_name().split(" ")) == 2  # Real coolname slug
     print(f"✓ Generated user names: {name1}, {name2}")
 
-    # Test token generation
-    token1 = generate_session_token()
-    token2 = generate_session_token()
-    assert token1 != token2  # Should be different
-    assert len(token1) > 20  # Should be reasonably long
-    print(f"✓ Generated session tokens: {token1[:10]}..., {token2[:10]}...")
+    # Test token generation with a deterministic token source
+    counter = itertools.count()
+    with patch("app.utils._token_rng", lambda: f"tok{next(counter)}"):
+        token1 = generate_session_token()
+        token2 = generate_session_token()
+    assert token1 == "tok0"
+    assert token2 == "tok1"
+    assert len(generate_session_token()) > 20  # Real token is reasonably long
+    print(f"✓ Generated session tokens: {token1}, {token2}")
 
     # Test QR code generation
     qr_bytes = generate_qr_code("https://example.com")
     assert len(qr_bytes) > 0
     assert qr_bytes.startswith(b"\x89PNG")  # PNG header
+    assert generate_qr_code("https://example.com") is qr_bytes  # cached
     print("✓ Generated QR code")
 
     print("All utility tests passed! ✅")
@@ -111,15 +170,14 @@ def test_utility_functions():
 
 async def test_game_simulation():
     """Simulate a complete game flow."""
-    print("\nSimulating complete game flow...")
+    test_db_path = fresh_test_database("test")
+    async with Database(test_db_path) as db:
+        await simulate_game(db)
 
-    # Setup test database
-    test_db_path = "data/test.db"
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-    create_database(test_db_path)
 
-    db = Database(test_db_path)
+async def simulate_game(db: Database):
+    """Simulate a complete game flow against db."""
+    print("\nSimulating complete game flow...")
 
     # Create multiple users
     users = []
@@ -146,13 +204,17 @@ async def test_game_simulation():
     await db.start_session(session_id)
     print(f"✓ Created and started session (ID: {session_id})")
 
-    # Each user rates each meme
+    # Each user rates each meme with seeded scores drawn in one call,
+    # written in one batch
     import random
 
-    for user in users:
-        for meme in memes:
-            score = random.randint(1, 10)
-            await db.create_ranking(user["id"], meme["id"], score)
+    pairs = list(itertools.product(users, memes))
+    scores = random.Random(0).choices(range(1, 11), k=len(pairs))
+    rankings = [
+        (user["id"], meme["id"], score) for (user, meme), score in zip(pairs, scores)
+    ]
+    written = await db.create_rankings_bulk(rankings, session_id=session_id)
+    assert written == len(pairs)
 
     print("✓ All users rated all memes")
 
@@ -181,6 +243,8 @@ def test_authentication():
     # Test password hashing
     password = "test_password"
     hashed = get_password_hash(password)
+    # Work factor comes from BCRYPT_ROUNDS (4 under pytest, see conftest.py)
+    assert hashed.startswith(f"$2b${get_settings().bcrypt_rounds:02d}$")
     assert verify_password(password, hashed)
     assert not verify_password("wrong_password", hashed)
     print("✓ Password hashing working")
@@ -200,18 +264,22 @@ async def main():
     """Run all tests."""
     print("🧪 Running Memes Ranker Integration Tests\n")
 
+    # One database and one warm connection shared by the async tests
+    test_db_path = fresh_test_database("test")
+
     try:
-        # Test database operations
-        await test_database_operations()
+        async with Database(test_db_path) as db:
+            # Test database operations
+            await check_database_operations(db)
 
-        # Test utility functions
-        test_utility_functions()
+            # Test utility functions
+            test_utility_functions()
 
-        # Test authentication
-        test_authentication()
+            # Test authentication
+            test_authentication()
 
-        # Test complete game simulation
-        await test_game_simulation()
+            # Test complete game simulation
+            await simulate_game(db)
 
         print("\n🎉 All tests passed! The memes ranker application is ready!")
         print("\nTo start the application:")
@@ -231,5 +299,12 @@ async def main():
 
 
 if __name__ == "__main__":
-    success = asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        loop_factory = None
+    else:
+        loop_factory = uvloop.new_event_loop
+
+    success = asyncio.run(main(), loop_factory=loop_factory)
     sys.exit(0 if success else 1)
@@ -1,92 +1,159 @@
 """Integration tests for memes-ranker game flow."""
 
 import asyncio
+import functools
 import os
-import tempfile
+import re
+import sqlite3
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app import database
 from app.database import Database
 from app.main import app
+from app.utils import get_settings
+
+# Wipes every table and AUTOINCREMENT counter in one transaction,
+# children first for foreign keys
+RESET_SQL = """
+BEGIN;
+DELETE FROM rankings;
+DELETE FROM results_reveal;
+DELETE FROM sessions;
+DELETE FROM memes;
+DELETE FROM users;
+DELETE FROM sqlite_sequence;
+COMMIT;
+"""
+
+# Rows inserted by TestGameIntegration._create_test_memes
+TEST_MEMES = [
+    ("test-meme-1.png", "/static/memes/test-meme-1.png"),
+    ("test-meme-2.png", "/static/memes/test-meme-2.png"),
+    ("test-meme-3.png", "/static/memes/test-meme-3.png"),
+]
+
+
+@functools.cache
+def _seeded_memes(client):
+    """Fetch /api/memes once per client after TEST_MEMES is seeded.
+
+    RESET_SQL also resets AUTOINCREMENT counters, so every test that seeds
+    TEST_MEMES into the emptied database gets the same ids and the response
+    can be reused.
+    """
+    return client.get("/api/memes").json()["memes"]
+
+
+@pytest.fixture(scope="session")
+def test_db_path():
+    """Create an in-memory test database once for the whole test session.
+
+    The memdb URI lets the app and the tests open the same database, with
+    normal locking so busy_timeout applies to concurrent writers; it lives
+    as long as the anchor connection held by this fixture.
+    """
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    db_path = f"file:/memes_test_{worker_id}?vfs=memdb"
+    anchor = sqlite3.connect(db_path, uri=True)
+
+    # Credentials are set in conftest.py, before the app is imported
+    os.environ["DATABASE_PATH"] = db_path
+    get_settings.cache_clear()
+
+    # Initialize database
+    from setup_db import create_database
+
+    create_database(db_path)
+    yield db_path
+    anchor.close()
+
+
+@pytest.fixture(scope="module")
+def client(test_db_path):
+    """Test client whose application database is the test database.
+
+    Entering the client runs the app's startup once for the module.
+    """
+    original_path = database.db.db_path
+    database.db.db_path = test_db_path
+    with TestClient(app) as test_client:
+        yield test_client
+    database.db.db_path = original_path
+
+
+@pytest.fixture(scope="module")
+def admin_cookies(client):
+    """Log the admin in once and reuse the token cookie across tests."""
+    response = client.post(
+        "/admin/login",
+        data={"password": "test_admin_password"},
+        follow_redirects=False,
+    )
+    assert response.status_code == 302
+    return {"admin_token": response.cookies["admin_token"]}
+
+
+@pytest.fixture(scope="session")
+def db(test_db_path):
+    """Database instance for direct access."""
+    return Database(test_db_path)
+
+
+@pytest.fixture(autouse=True)
+def reset_state(test_db_path, client):
+    """Empty all tables and drop client cookies before each test."""
+    conn = sqlite3.connect(test_db_path, uri=True)
+    try:
+        conn.executescript(RESET_SQL)
+    finally:
+        conn.close()
+    client.cookies.clear()
 
 
 class TestGameIntegration:
     """Integration tests for the complete game flow."""
 
-    def setup_method(self):
-        """Set up test environment."""
-        # Create temporary database
-        self.test_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
-        self.test_db.close()
-
-        # Set environment variables for testing
-        os.environ["DATABASE_PATH"] = self.test_db.name
-        os.environ["ADMIN_PASSWORD"] = "test_admin_password"
-        os.environ["JWT_SECRET_KEY"] = "test_jwt_secret_key"
-
-        # Initialize database
-        from setup_db import create_database
-
-        create_database(self.test_db.name)
-
-        # Create test client
-        self.client = TestClient(app)
-
-        # Create database instance for direct access
-        self.db = Database(self.test_db.name)
-
-    def teardown_method(self):
-        """Clean up test environment."""
-        # Remove temporary database
-        if os.path.exists(self.test_db.name):
-            os.unlink(self.test_db.name)
-
-    def test_user_registration_and_session_creation(self):
+    def test_user_registration_and_session_creation(self, client):
         """Test that users are automatically registered with unique names."""
         # First request should create a new user
-        response = self.client.get("/")
+        response = client.get("/")
         assert response.status_code == 200
 
         # Check that session cookie is set
         assert "session_token" in response.cookies
 
-        # Extract user name from response
-        content = response.text
-        assert "badge" in content  # User name should be displayed in badge
+        # The generated user name is shown in the welcome message
+        match = re.search(r"Welcome, ([^!<]+)!", response.text)
+        assert match is not None
+        user_name = match.group(1)
 
         # Second request with same session should return same user
         session_token = response.cookies["session_token"]
-        response2 = self.client.get("/", cookies={"session_token": session_token})
+        response2 = client.get("/", cookies={"session_token": session_token})
         assert response2.status_code == 200
+        assert f"Welcome, {user_name}!" in response2.text
 
-        # Should have same session token
-        assert response2.cookies.get("session_token") == session_token
-
-    def test_complete_game_flow(self):
+    def test_complete_game_flow(self, client, db):
         """Test complete game flow: user registration, meme rating, completion."""
         # Step 1: User visits site and gets registered
-        response = self.client.get("/")
+        response = client.get("/")
         assert response.status_code == 200
         session_token = response.cookies["session_token"]
 
-        # Step 2: Admin populates memes
-        admin_login = self.client.post(
-            "/admin/login", data={"password": "test_admin_password"}
-        )
-        assert admin_login.status_code == 302
-        # Admin token is set in cookies for authentication
-
-        # Create some test memes in database
-        asyncio.run(self._create_test_memes())
+        # Step 2: Seed memes directly and start a session to rank in
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
 
         # Step 3: User rates memes
-        memes_response = self.client.get("/api/memes")
+        memes_response = client.get("/api/memes")
         memes = memes_response.json()["memes"]
         assert len(memes) > 0
 
         # Rate first meme
-        rating_response = self.client.post(
+        rating_response = client.post(
             "/rank",
             json={"meme_id": memes[0]["id"], "score": 8},
             cookies={"session_token": session_token},
@@ -94,7 +161,7 @@ class TestGameIntegration:
         assert rating_response.status_code == 200
 
         # Rate second meme
-        rating_response2 = self.client.post(
+        rating_response2 = client.post(
             "/rank",
             json={"meme_id": memes[1]["id"], "score": 5},
             cookies={"session_token": session_token},
@@ -102,105 +169,97 @@ class TestGameIntegration:
         assert rating_response2.status_code == 200
 
         # Step 4: Check stats
-        stats_response = self.client.get("/api/stats")
+        stats_response = client.get("/api/stats")
         stats = stats_response.json()["stats"]
 
         # Should have statistics for rated memes
         rated_stats = [s for s in stats if s["ranking_count"] > 0]
         assert len(rated_stats) >= 2
 
-    def test_multiple_users_rating_same_meme(self):
+    def test_multiple_users_rating_same_meme(self, client, db):
         """Test multiple users rating the same meme."""
-        # Create test memes
-        asyncio.run(self._create_test_memes())
-
-        # User 1 rates meme
-        response1 = self.client.get("/")
-        session_token1 = response1.cookies["session_token"]
-
-        memes_response = self.client.get("/api/memes")
-        memes = memes_response.json()["memes"]
-
-        self.client.post(
-            "/rank",
-            json={"meme_id": memes[0]["id"], "score": 9},
-            cookies={"session_token": session_token1},
-        )
-
-        # User 2 rates same meme
-        response2 = self.client.get("/")
-        session_token2 = response2.cookies["session_token"]
+        # Create test memes and an active session to rank in
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
+
+        memes = _seeded_memes(client)
+
+        async def user_rates(score):
+            # Each user gets its own client, so its own cookie jar
+            async with self._async_client() as user_client:
+                response = await user_client.get("/")
+                session_token = response.cookies["session_token"]
+                rank_response = await user_client.post(
+                    "/rank", json={"meme_id": memes[0]["id"], "score": score}
+                )
+                assert rank_response.status_code == 200
+                return session_token
+
+        async def both_users_rate():
+            return await asyncio.gather(user_rates(9), user_rates(6))
+
+        # Both users register and rate concurrently
+        session_token1, session_token2 = client.portal.call(both_users_rate)
         assert session_token2 != session_token1  # Different users
 
-        self.client.post(
-            "/rank",
-            json={"meme_id": memes[0]["id"], "score": 6},
-            cookies={"session_token": session_token2},
-        )
-
         # Check that average is calculated correctly
-        stats_response = self.client.get("/api/stats")
+        stats_response = client.get("/api/stats")
         stats = stats_response.json()["stats"]
 
         meme_stat = next(s for s in stats if s["id"] == memes[0]["id"])
         assert meme_stat["ranking_count"] == 2
         assert meme_stat["average_score"] == 7.5  # (9 + 6) / 2
 
-    def test_user_updates_rating(self):
+    def test_user_updates_rating(self, client, db):
         """Test that user can update their rating for a meme."""
-        # Create test memes
-        asyncio.run(self._create_test_memes())
+        # Create test memes and an active session to rank in
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
 
         # User rates meme
-        response = self.client.get("/")
+        response = client.get("/")
         session_token = response.cookies["session_token"]
 
-        memes_response = self.client.get("/api/memes")
-        memes = memes_response.json()["memes"]
+        memes = _seeded_memes(client)
 
         # Initial rating
-        self.client.post(
+        rating_response = client.post(
             "/rank",
             json={"meme_id": memes[0]["id"], "score": 7},
             cookies={"session_token": session_token},
         )
+        assert rating_response.status_code == 200
 
         # Updated rating
-        self.client.post(
+        rating_response = client.post(
             "/rank",
             json={"meme_id": memes[0]["id"], "score": 4},
             cookies={"session_token": session_token},
         )
+        assert rating_response.status_code == 200
 
         # Check that rating was updated, not duplicated
-        stats_response = self.client.get("/api/stats")
+        stats_response = client.get("/api/stats")
         stats = stats_response.json()["stats"]
 
         meme_stat = next(s for s in stats if s["id"] == memes[0]["id"])
         assert meme_stat["ranking_count"] == 1  # Still only one rating
         assert meme_stat["average_score"] == 4.0  # Updated score
 
-    def test_admin_session_management(self):
+    def test_admin_session_management(self, client, admin_cookies):
         """Test admin session creation and management."""
-        # Admin login
-        admin_login = self.client.post(
-            "/admin/login", data={"password": "test_admin_password"}
-        )
-        assert admin_login.status_code == 302
-        # Admin token is set in cookies for authentication
-
         # Access admin dashboard
-        dashboard_response = self.client.get(
+        dashboard_response = client.get(
             "/admin/dashboard",
-            cookies={"admin_token": admin_login.cookies["admin_token"]},
+            cookies=admin_cookies,
         )
         assert dashboard_response.status_code == 200
 
         # Create new session
-        session_response = self.client.post(
+        session_response = client.post(
             "/admin/session",
             json={"name": "Test Session"},
-            cookies={"admin_token": admin_login.cookies["admin_token"]},
+            cookies=admin_cookies,
         )
         assert session_response.status_code == 200
 
@@ -209,72 +268,154 @@ class TestGameIntegration:
         assert session_data["status"] == "success"
         assert "session_id" in session_data
 
-    def test_rating_validation(self):
+    def test_rating_validation(self, client, db):
         """Test that rating validation works correctly."""
-        # Create test memes
-        asyncio.run(self._create_test_memes())
+        # Create test memes and an active session to rank in
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
 
         # User registration
-        response = self.client.get("/")
+        response = client.get("/")
         session_token = response.cookies["session_token"]
 
-        memes_response = self.client.get("/api/memes")
-        memes = memes_response.json()["memes"]
+        memes = _seeded_memes(client)
 
-        # Test invalid scores
+        # Post invalid scores concurrently in one gather
         invalid_scores = [-1, 11, 15, -5]
+        responses = self._post_rankings(
+            client, session_token, memes[0]["id"], invalid_scores
+        )
 
-        for score in invalid_scores:
-            rating_response = self.client.post(
-                "/rank",
-                json={"meme_id": memes[0]["id"], "score": score},
-                cookies={"session_token": session_token},
-            )
-            assert rating_response.status_code == 400
+        # RankingRequest bounds the score, so FastAPI rejects it with 422
+        for rating_response in responses:
+            assert rating_response.status_code == 422
 
-        # Test valid scores
+        # Valid scores go in one bulk request, written in one transaction
         valid_scores = [0, 1, 5, 10]
+        rating_response = client.post(
+            "/rank/bulk",
+            json=[
+                {"meme_id": memes[0]["id"], "score": score} for score in valid_scores
+            ],
+            cookies={"session_token": session_token},
+        )
+        assert rating_response.status_code == 200
+
+    def test_bulk_rating(self, client, db):
+        """Test rating several memes in one bulk request."""
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
+
+        response = client.get("/")
+        session_token = response.cookies["session_token"]
 
-        for score in valid_scores:
-            rating_response = self.client.post(
-                "/rank",
-                json={"meme_id": memes[0]["id"], "score": score},
-                cookies={"session_token": session_token},
+        memes = _seeded_memes(client)
+        scores = [3, 7, 10]
+        rating_response = client.post(
+            "/rank/bulk",
+            json=[
+                {"meme_id": meme["id"], "score": score}
+                for meme, score in zip(memes, scores)
+            ],
+            cookies={"session_token": session_token},
+        )
+        assert rating_response.status_code == 200
+        assert rating_response.json()["count"] == len(scores)
+
+        stats = client.get("/api/stats").json()["stats"]
+        averages = {s["id"]: s["average_score"] for s in stats}
+        for meme, score in zip(memes, scores):
+            assert averages[meme["id"]] == score
+
+    def test_rating_with_cookies_from_reset_database(self, client, db, test_db_path):
+        """Test that cookies naming a deleted user are rejected and cleared."""
+        response = client.get("/")
+        old_cookies = {
+            "session_token": response.cookies["session_token"],
+            "user_session": response.cookies["user_session"],
+        }
+
+        # Reset the database; the signed cookie still names the old user
+        conn = sqlite3.connect(test_db_path, uri=True)
+        try:
+            conn.executescript(RESET_SQL)
+        finally:
+            conn.close()
+        asyncio.run(self._create_test_memes(db))
+        asyncio.run(self._start_test_session(db))
+
+        client.cookies.clear()
+        memes = _seeded_memes(client)
+        rating_response = client.post(
+            "/rank",
+            json={"meme_id": memes[0]["id"], "score": 5},
+            cookies=old_cookies,
+        )
+        assert rating_response.status_code == 401
+
+        # Both cookies are expired so the next visit registers a new user
+        set_cookies = rating_response.headers.get_list("set-cookie")
+        for name in old_cookies:
+            assert any(
+                header.startswith(f'{name}=""') and "Max-Age=0" in header
+                for header in set_cookies
             )
-            assert rating_response.status_code == 200
 
-    def test_qr_code_generation(self):
+    def test_qr_code_generation(self, client):
         """Test QR code generation endpoint."""
-        response = self.client.get("/qr-code")
+        response = client.get("/qr-code")
         assert response.status_code == 200
         assert response.headers["content-type"] == "image/png"
         assert len(response.content) > 0
 
-    def test_unauthenticated_access(self):
+    def test_unauthenticated_access(self, client):
         """Test behavior with unauthenticated requests."""
         # Test rating without session
-        rating_response = self.client.post("/rank", json={"meme_id": 1, "score": 5})
+        rating_response = client.post("/rank", json={"meme_id": 1, "score": 5})
         assert rating_response.status_code == 401
 
         # Test admin endpoints without auth
-        admin_response = self.client.get("/admin/dashboard")
+        admin_response = client.get("/admin/dashboard")
         assert admin_response.status_code == 401
 
-        session_response = self.client.post(
-            "/admin/session", json={"name": "Test Session"}
-        )
+        session_response = client.post("/admin/session", json={"name": "Test Session"})
         assert session_response.status_code == 401
 
-    async def _create_test_memes(self):
+    def _async_client(self, **kwargs):
+        """Async client that calls the app in-process.
+
+        Use it on the TestClient's portal so requests share the app's loop.
+        """
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test", **kwargs
+        )
+
+    def _post_rankings(self, client, session_token, meme_id, scores):
+        """POST one ranking per score concurrently on the app's event loop."""
+
+        async def post_all():
+            async with self._async_client(
+                cookies={"session_token": session_token}
+            ) as async_client:
+                return await asyncio.gather(
+                    *(
+                        async_client.post(
+                            "/rank", json={"meme_id": meme_id, "score": score}
+                        )
+                        for score in scores
+                    )
+                )
+
+        return client.portal.call(post_all)
+
+    async def _start_test_session(self, db):
+        """Helper method to create and start a ranking session."""
+        session_id = await db.create_session("Test Session")
+        await db.start_session(session_id)
+
+    async def _create_test_memes(self, db):
         """Helper method to create test memes in database."""
-        test_memes = [
-            ("test-meme-1.png", "/static/memes/test-meme-1.png"),
-            ("test-meme-2.png", "/static/memes/test-meme-2.png"),
-            ("test-meme-3.png", "/static/memes/test-meme-3.png"),
-        ]
-
-        for filename, path in test_memes:
-            await self.db.create_meme(filename, path)
+        await db.create_memes_bulk(TEST_MEMES)
 
 
 # Run tests directly
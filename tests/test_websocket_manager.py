@@ -0,0 +1,119 @@
+"""Unit tests for WebSocketManager against fake WebSocket connections."""
+
+import asyncio
+from typing import List, Optional
+
+import orjson
+import pytest
+from fastapi import status
+
+from app.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Records what the manager sends; sends block while ``gate`` is unset."""
+
+    def __init__(self):
+        self.sent: List[bytes] = []
+        self.close_code: Optional[int] = None
+        self.gate: Optional[asyncio.Event] = None
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+        if self.gate is not None:
+            await self.gate.wait()
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+async def _until(predicate):
+    """Let other tasks run until predicate() holds."""
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition was never reached")
+
+
+@pytest.fixture
+async def manager(monkeypatch):
+    """Manager without the debounced stats worker, disconnected afterwards."""
+    manager = WebSocketManager()
+    monkeypatch.setattr(manager, "broadcast_connection_stats", lambda: None)
+    yield manager
+    for websocket in list(manager.connection_info):
+        if websocket.gate is not None:
+            websocket.gate.set()
+        await manager.disconnect(websocket)
+
+
+async def _connect(manager, count: int) -> List[FakeWebSocket]:
+    websockets = [FakeWebSocket() for _ in range(count)]
+    for number, websocket in enumerate(websockets):
+        await manager.connect(websocket, "users", f"user-{number}")
+    return websockets
+
+
+async def test_disconnect_from_middle_keeps_index_consistent(manager):
+    """Swap-remove moves the last connection into the freed slot."""
+    first, second, third, fourth = await _connect(manager, 4)
+
+    await manager.disconnect(second)
+
+    users = manager.connections["users"]
+    assert users == [first, fourth, third]
+    assert manager._index["users"] == {
+        websocket: position for position, websocket in enumerate(users)
+    }
+    assert manager.get_connection_stats()["user_connections"] == 3
+
+
+async def test_backlog_is_sent_as_one_array_frame(manager):
+    """Messages queued during a send are merged; a lone one stays an object."""
+    (websocket,) = await _connect(manager, 1)
+    websocket.gate = asyncio.Event()
+
+    # The welcome frame is sent directly; the first broadcast goes out alone
+    manager.broadcast_nowait("users", orjson.dumps({"n": 1}))
+    await _until(lambda: len(websocket.sent) == 2)
+
+    # These pile up while the first send is stalled
+    manager.broadcast_nowait("users", orjson.dumps({"n": 2}))
+    manager.broadcast_nowait("users", orjson.dumps({"n": 3}))
+    websocket.gate.set()
+    await _until(lambda: len(websocket.sent) == 3)
+
+    assert orjson.loads(websocket.sent[0])["type"] == "connection_established"
+    assert orjson.loads(websocket.sent[1]) == {"n": 1}
+    assert orjson.loads(websocket.sent[2]) == [{"n": 2}, {"n": 3}]
+
+
+async def test_full_queue_drops_slow_client(manager):
+    """A client whose queue overflows is closed with 1013 and removed."""
+    manager.SEND_QUEUE_SIZE = 2
+    slow, healthy = await _connect(manager, 2)
+    slow.gate = asyncio.Event()
+    healthy_queue = manager.connection_info[healthy]["queue"]
+
+    async def broadcast():
+        manager.broadcast_nowait("users", b"{}")
+        await _until(healthy_queue.empty)
+
+    # The first message stalls the slow writer; the next two fill its queue
+    await broadcast()
+    await broadcast()
+    await broadcast()
+    assert slow.close_code is None
+
+    await broadcast()
+    await _until(lambda: slow.close_code is not None)
+
+    assert slow.close_code == status.WS_1013_TRY_AGAIN_LATER
+    assert manager.connections["users"] == [healthy]
+    assert slow not in manager._index["users"]
+    assert slow not in manager.connection_info
+    assert manager.get_connection_stats()["user_connections"] == 1